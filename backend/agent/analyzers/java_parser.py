@@ -1,28 +1,92 @@
 import os, re
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 PACKAGE_RE = re.compile(r'^\s*package\s+([\w\.]+)\s*;', re.MULTILINE)
 CLASS_RE = re.compile(r'\b(class|interface|enum)\s+(\w+)')
 METHOD_RE = re.compile(r'(public|protected|private)\s+[\w\<\>\[\]]+\s+(\w+)\s*\(([^)]*)\)\s*(?:throws\s+[\w\.,\s]+)?\s*\{', re.MULTILINE)
 
+# build output / vendored folders that never contain sources worth summarizing (matched against folder names)
+SKIP_DIRS = frozenset(("target", "build", "out", "node_modules", "generated-sources"))
+
+# only the head of each file is scanned; declarations of interest sit near the top and generated sources can be huge
+HEAD_CHARS = 64 * 1024
+
+# literal keywords every CLASS_RE match has to start with (PACKAGE_RE is anchored on its line start).
+# Only the rare package/class lookups are keyword-anchored: public/private/protected sit on nearly every
+# declaration line, so for METHOD_RE the Python loop in _scan costs more than finditer's own C scan.
+CLASS_KEYWORDS = ("class", "interface", "enum")
+
+# Yield non-overlapping matches of rx, in order, trying it only where one of the keywords occurs.
+# Same results as rx.finditer(src) when every match starts with a keyword, but str.find skips the
+# (mostly non-matching) text between declarations in C instead of running the regex at each offset.
+def _scan(src: str, rx, keywords):
+    nxt = {k: src.find(k) for k in keywords}
+    pos = 0
+    while True:
+        for k, i in nxt.items():
+            if -1 < i < pos:
+                nxt[k] = src.find(k, pos)
+        hits = [i for i in nxt.values() if i != -1]
+        if not hits:
+            return
+        i = min(hits)
+        m = rx.match(src, i)
+        if m:
+            yield m
+            pos = max(m.end(), i + 1)
+        else:
+            pos = i + 1
+
+def _find_package(src: str):
+    i = src.find("package")
+    while i != -1:
+        m = PACKAGE_RE.match(src, src.rfind("\n", 0, i) + 1)
+        if m:
+            return m.group(1)
+        i = src.find("package", i + 1)
+    return None
+
 # walk through a folder and list all .java files.
+# os.scandir is used directly (not os.walk) so the DirEntry type info is reused instead of re-derived per entry.
 def discover_java_files(root: str) -> List[str]:
     files = []
-    for base, _, names in os.walk(root):
-        lowered = base.lower()
-        if any(skip in lowered for skip in ["target", "build", "out", "node_modules", "generated-sources"]):
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
             continue
-        for n in names:
-            if n.endswith(".java"):
-                files.append(os.path.join(base, n))
+        subdirs = []
+        with it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    # skipped trees are never entered
+                    if name.lower() not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+                elif name.endswith(".java") and entry.is_file():
+                    files.append(entry.path)
+        stack.extend(reversed(subdirs))
     return files
 
 # give a quick summary of a single Java source file
 def summarize_java(file_path: str) -> Dict:
     with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        src = f.read()
-    pkg = (PACKAGE_RE.search(src).group(1)) if PACKAGE_RE.search(src) else None
-    cls = (CLASS_RE.search(src).group(2)) if CLASS_RE.search(src) else None
+        src = f.read(HEAD_CHARS)
+        cls_m = next(_scan(src, CLASS_RE, CLASS_KEYWORDS), None)
+        if cls_m is None and len(src) == HEAD_CHARS:
+            # no type declaration in the head (e.g. a huge license/comment block): fall back to the whole file
+            src += f.read()
+            cls_m = next(_scan(src, CLASS_RE, CLASS_KEYWORDS), None)
+    pkg = _find_package(src)
+    cls = cls_m.group(2) if cls_m else None
     methods = [{'name': m.group(2), 'params': m.group(3).strip()} for m in METHOD_RE.finditer(src)]
     snippet = src[:2000]
     return {'file': file_path, 'package': pkg, 'class': cls, 'methods': methods, 'snippet': snippet}
+
+# same as summarize_java, but returns None instead of raising so one bad file can't poison a worker pool
+def summarize_java_safe(file_path: str) -> Optional[Dict]:
+    try:
+        return summarize_java(file_path)
+    except Exception:
+        return None
@@ -1,28 +1,38 @@
 from __future__ import annotations
 from typing import List, Dict
+import functools
+import mmap
 import os
 import re
-import io
 
 # ----------------------------- FILE BLOCK PARSERS -----------------------------
 
-FILE_BLOCK_RE_A = re.compile(
-    r"(?s)<<<FILE:(?P<path>[^>]+)>>>\s*```(?:[\w+-]+)?\s*(?P<body>.*?)```.*?<<<END_FILE>>>"
-)
-
-FILE_BLOCK_RE_B = re.compile(
-    r"(?m)^FILE:\s*(?P<path>[^\n]+)\n```(?:[\w+-]+)?\n(?P<body>.*?)\n```",
-    re.S,
+# Both accepted block styles in one alternation so the LLM output is scanned once:
+#   A: <<<FILE:path>>> ```lang ... ``` <<<END_FILE>>>
+#   B: FILE: path\n```lang\n...\n```  (FILE: at the start of a line)
+# Whitespace and language tags use explicit ASCII classes (not \s/\w), so the str pattern and its
+# bytes build below match exactly the same blocks. An A body always ends at its first closing fence
+# (atomic group: no backtracking into it), and the text from there to <<<END_FILE>>> never runs past
+# the next block's opener, so a block missing its end marker can't swallow the blocks that follow it.
+FILE_BLOCK_RE = re.compile(
+    r"<<<FILE:(?P<path_a>[^>]+)>>>[ \t\r\n\f\v]*```(?:[A-Za-z0-9_+-]+)?[ \t\r\n\f\v]*"
+    r"(?>(?P<body_a>.*?)```)(?:(?!^FILE:|<<<FILE:).)*?<<<END_FILE>>>"
+    r"|^FILE:[ \t\r\n\f\v]*(?P<path_b>[^\n]+)\n```(?:[A-Za-z0-9_+-]+)?\n(?P<body_b>.*?)\n```",
+    re.M | re.S,
 )
+# Same pattern for scanning the raw output file through mmap without decoding all of it.
+FILE_BLOCK_RE_BYTES = re.compile(FILE_BLOCK_RE.pattern.encode("ascii"), re.M | re.S)
 
 ALLOWED_ROOTS = ("unit-tests", "bdd-tests")
 
 
-def _safe_join(root: str, rel: str) -> str:
-    """Resolve and validate a relative path so it stays inside 'root'."""
+def _safe_join(root: str, rel: str, root_abs: str | None = None) -> str:
+    """Resolve and validate a relative path so it stays inside 'root'.
+    Callers joining many paths can pass root_abs (os.path.abspath(root)) to skip recomputing it."""
     rel = (rel or "").strip().lstrip("/\\")
-    full = os.path.abspath(os.path.join(root, rel))
-    root_abs = os.path.abspath(root)
+    if root_abs is None:
+        root_abs = os.path.abspath(root)
+    full = os.path.abspath(os.path.join(root_abs, rel))
     if full != root_abs and not full.startswith(root_abs + os.sep):
         raise ValueError(f"Unsafe path refused: {rel}")
     return full
@@ -33,28 +43,43 @@ def _clean_body(text: str) -> str:
     if text is None:
         return ""
     # Normalize CRLF -> LF, then trim trailing spaces/newlines once.
-    return re.sub(r"\r\n?", "\n", text).rstrip() + "\n"
+    return text.replace("\r\n", "\n").replace("\r", "\n").rstrip() + "\n"
 
 
-def _materialize(text: str, out_root: str, allowed_roots=ALLOWED_ROOTS) -> int:
-    """Write all FILE blocks from 'text' into 'out_root'. Return count written."""
+def _materialize(text, out_root: str, allowed_roots=ALLOWED_ROOTS) -> int:
+    """Write all FILE blocks from 'text' into 'out_root'. Return count written.
+    'text' is a str or a UTF-8 bytes-like buffer (e.g. an mmap); for buffers only matched blocks are decoded."""
     count = 0
     if not text:
         return 0
 
-    for regex in (FILE_BLOCK_RE_A, FILE_BLOCK_RE_B):
-        for m in regex.finditer(text):
-            rel = (m.group("path") or "").strip().replace("\\", "/")
-            # Only allow files directly under unit-tests/** or bdd-tests/**
-            if not any(rel == p or rel.startswith(p + "/") for p in allowed_roots):
-                continue
-
-            body = _clean_body(m.group("body"))
-            full = _safe_join(out_root, rel)
-            os.makedirs(os.path.dirname(full), exist_ok=True)
-            with open(full, "w", encoding="utf-8") as f:
-                f.write(body)
-            count += 1
+    root_abs = os.path.abspath(out_root)
+    root_names = frozenset(allowed_roots)
+    root_prefixes = tuple(p + "/" for p in allowed_roots)
+    # FILE blocks mostly share a few parent folders; create each one only once
+    made_dirs = set()
+    regex = FILE_BLOCK_RE if isinstance(text, str) else FILE_BLOCK_RE_BYTES
+    for m in regex.finditer(text):
+        if m.group("path_a") is not None:
+            rel, body = m.group("path_a"), m.group("body_a")
+        else:
+            rel, body = m.group("path_b"), m.group("body_b")
+        if regex is FILE_BLOCK_RE_BYTES:
+            rel, body = rel.decode("utf-8", "replace"), body.decode("utf-8", "replace")
+        rel = (rel or "").strip().replace("\\", "/")
+        # Only allow files directly under unit-tests/** or bdd-tests/**
+        if rel not in root_names and not rel.startswith(root_prefixes):
+            continue
+
+        body = _clean_body(body)
+        full = _safe_join(out_root, rel, root_abs)
+        parent = os.path.dirname(full)
+        if parent not in made_dirs:
+            os.makedirs(parent, exist_ok=True)
+            made_dirs.add(parent)
+        with open(full, "w", encoding="utf-8") as f:
+            f.write(body)
+        count += 1
 
     return count
 
@@ -63,24 +88,71 @@ def build_context_bundle(
     summaries: List[Dict], max_files: int = 32, per_file_chars: int = 1500
 ) -> str:
     """Make a compact, LLM-friendly context from analyzer summaries."""
-    buf = io.StringIO()
-    buf.write("# Repository Context\n")
+    parts = ["# Repository Context\n"]
     for s in summaries[:max_files]:
         f = s.get("file", "")
         pkg = s.get("package") or ""
         cls = s.get("class") or ""
         methods = ", ".join(m.get("name") for m in s.get("methods", [])[:12])
-        buf.write(f"{f} :: {pkg}.{cls} :: methods[{methods}]\n")
+        parts.append(f"{f} :: {pkg}.{cls} :: methods[{methods}]\n")
         snippet = (s.get("snippet") or "")[:per_file_chars]
         if snippet:
-            buf.write("----8<----\n")
-            buf.write(snippet + "\n")
-            buf.write("---->8----\n\n")
-    return buf.getvalue()
+            parts.append(f"----8<----\n{snippet}\n---->8----\n\n")
+    return "".join(parts)
 
 
 # ------------------------------- MAIN PIPELINE -------------------------------
 
+# (Agent, Task, Crew, Process, ChatOpenAI), filled on first use so importing this module stays cheap
+_CREW_API = None
+
+
+def _lazy_import():
+    """Import crewai/langchain_openai once and keep the handles for later jobs."""
+    global _CREW_API
+    if _CREW_API is None:
+        from crewai import Agent, Task, Crew, Process
+        from langchain_openai import ChatOpenAI
+        _CREW_API = (Agent, Task, Crew, Process, ChatOpenAI)
+    return _CREW_API
+
+
+def preload_crewai() -> None:
+    """Import the CrewAI stack ahead of time (e.g. while the repo is cloning); failures surface later."""
+    try:
+        _lazy_import()
+    except Exception:
+        pass
+
+
+@functools.lru_cache(maxsize=4)
+def _llm_and_tools(model: str, api_key: str):
+    """
+    Build the chat model and the mapper toolkit once per (model, key).
+    The key is part of the cache key because every job may bring its own key.
+    Agents are not cached: CrewAI binds them to the running crew, and jobs can run concurrently.
+    """
+    ChatOpenAI = _lazy_import()[4]
+
+    try:
+        from .tools.mapper_tools import mapper_toolkit
+    except Exception:
+        try:
+            from backend.agent.tools.mapper_tools import mapper_toolkit
+        except Exception:
+            from tools.mapper_tools import mapper_toolkit
+
+    # --- LLM: explicit & deterministic enough for code generation ---
+    llm = ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        temperature=0.2,
+        timeout=120,
+        max_retries=2,
+    )
+    return llm, mapper_toolkit()
+
+
 def run_crewai_generation(
     repo_context: str,
     user_prompt: str,
@@ -89,6 +161,7 @@ def run_crewai_generation(
     out_dir: str,
     do_unit: bool,
     do_bdd: bool,
+    api_key: str | None = None,
 ) -> int:
     """
     Execute CrewAI agents to propose targets and generate tests.
@@ -99,32 +172,14 @@ def run_crewai_generation(
     # --- Provider/Key checks (we currently support OpenAI only) ---
     if provider.lower() != "openai":
         raise RuntimeError(f"Unsupported provider '{provider}'. Only 'openai' is supported.")
-    if not os.environ.get("OPENAI_API_KEY"):
+    if not api_key:
         raise RuntimeError(
-            "OPENAI_API_KEY not set; cannot run CrewAI with OpenAI provider."
+            "No OpenAI API key given; cannot run CrewAI with OpenAI provider."
         )
 
-    # --- Imports here to keep top-level import fast for environments without deps ---
-    from crewai import Agent, Task, Crew, Process
-    from langchain_openai import ChatOpenAI
-
-    try:
-        from .tools.mapper_tools import mapper_toolkit
-    except Exception:
-        try:
-            from backend.agent.tools.mapper_tools import mapper_toolkit
-        except Exception:
-            from tools.mapper_tools import mapper_toolkit
-
-    tool_instances = mapper_toolkit()        
-
-    # --- LLM: explicit & deterministic enough for code generation ---
-    llm = ChatOpenAI(
-        model=model or os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
-        temperature=0.2,
-        timeout=120,
-        max_retries=2,
-    )
+    # --- Imports are deferred to keep top-level import fast for environments without deps ---
+    Agent, Task, Crew, Process, _ = _lazy_import()
+    llm, tool_instances = _llm_and_tools(model or os.environ.get("OPENAI_MODEL", "gpt-4o-mini"), api_key)
 
     # --------------------------- AGENTS ---------------------------------------
     mapper = Agent(
@@ -363,19 +418,27 @@ def run_crewai_generation(
 
     # Some CrewAI versions return a complex object; stringify is safest
     content = str(result) if result is not None else ""
+    del result  # the result object holds the raw output too; 'content' must be the last reference
 
     # Always persist the raw LLM output for troubleshooting
     os.makedirs(out_dir, exist_ok=True)
     raw_path = os.path.join(out_dir, "_crewai_raw.md")
     try:
-        with open(raw_path, "w", encoding="utf-8") as f:
-            f.write(content or "")
+        # newline="" keeps the bytes on disk identical to 'content' so FILE blocks match on every OS
+        with open(raw_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
     except Exception:
-        # Non-fatal: continue
-        pass
+        # Non-fatal: extract from the in-memory string instead
+        written = _materialize(content, out_dir, allowed_roots=ALLOWED_ROOTS)
+    else:
+        # Extract FILE blocks from a read-only mapping of the raw file so the (possibly large)
+        # output string can be released first; only matched blocks get decoded again.
+        written = 0
+        if content:
+            del content
+            with open(raw_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                written = _materialize(mm, out_dir, allowed_roots=ALLOWED_ROOTS)
 
-    # Write files extracted from FILE blocks (only under allowed roots)
-    written = _materialize(content, out_dir, allowed_roots=ALLOWED_ROOTS)
     if written == 0:
         raise RuntimeError(
             "CrewAI produced no file blocks. Check _crewai_raw.md for the raw output."
@@ -1,7 +1,21 @@
 from __future__ import annotations
+from dataclasses import dataclass
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 
+@dataclass(slots=True, frozen=True)
+class PipelineOptions:
+    """Validated, immutable pipeline options as consumed by run_pipeline (built via BuildOptions.to_pipeline_options)."""
+    job_id: str
+    github_url: str
+    prompt: str = ""
+    llm_provider: str = "openai"
+    llm_model: str = "gpt-4o-mini"
+    api_key: Optional[str] = None
+    requirement_path: Optional[str] = None
+    generate_unit: bool = False
+    generate_bdd: bool = False
+
 class BuildOptions(BaseModel):
     """Single source of truth for pipeline options."""
     job_id: str
@@ -25,6 +39,20 @@ class BuildOptions(BaseModel):
     # Pydantic v2 config
     model_config = ConfigDict(populate_by_name=True, extra="ignore")
 
+    def to_pipeline_options(self) -> PipelineOptions:
+        """Hand the validated values to the pipeline as a plain slotted dataclass."""
+        return PipelineOptions(
+            job_id=self.job_id,
+            github_url=self.github_url,
+            prompt=self.prompt,
+            llm_provider=self.llm_provider,
+            llm_model=self.llm_model,
+            api_key=self.api_key,
+            requirement_path=self.requirement_path,
+            generate_unit=self.generate_unit,
+            generate_bdd=self.generate_bdd,
+        )
+
 class JobState(BaseModel):
     job_id: str
     status: str
@@ -1,10 +1,91 @@
+import hashlib
+import json
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Tuple
-from .models import BuildOptions
+from .models import PipelineOptions
 from .repo import shallow_clone
-from .analyzers.java_parser import discover_java_files, summarize_java
+from .analyzers.java_parser import HEAD_CHARS, discover_java_files, summarize_java_safe
 from .utils.zipper import zip_dir
 
+# How many summaries end up in the LLM context; we parse twice that to leave headroom for unparseable files.
+CONTEXT_FILES = 32
+
+# Sort key that puts production sources first (src/main/java, not tests), then shallower paths.
+# Ranks the path relative to the repo root, so folders above it (server cwd, work/<job>) can't count.
+def _source_rank(path: str, repo: str) -> Tuple[int, int, int]:
+    path = "/" + os.path.relpath(path, repo).replace("\\", "/")
+    p = path.lower()
+    # test classes by JUnit/Surefire naming, case-sensitively (Latest.java or Contest.java are not tests)
+    name = path.rsplit("/", 1)[-1]
+    is_test = "/test/" in p or name.startswith("Test") or name.endswith(("Test.java", "Tests.java", "IT.java"))
+    return (int(is_test), int("/src/main/java/" not in p), p.count("/"))
+
+# On-disk summary cache shared by all jobs (under <base_dir>/work). Keys describe content, not location:
+# every job clones into a fresh folder, so paths and mtimes never repeat but file contents do. A key is
+# the file size plus a digest of the head summarize_java reads, so computing it costs no more I/O than
+# parsing would. Bump PARSER_VERSION whenever summarize_java's output changes; a cache written by another
+# version is ignored. JSON, so loading it never runs code.
+SCAN_CACHE_NAME = ".scan_cache.json"
+SCAN_CACHE_MAX = 2000
+PARSER_VERSION = 1
+
+def _content_key(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        head = f.read(HEAD_CHARS)
+        size = os.fstat(f.fileno()).st_size
+    return f"{size}|{hashlib.blake2b(head, digest_size=16).hexdigest()}"
+
+def _load_scan_cache(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != PARSER_VERSION:
+        return {}
+    entries = data.get("entries")
+    return entries if isinstance(entries, dict) else {}
+
+def _save_scan_cache(path: str, cache: Dict[str, Dict]) -> None:
+    for k in list(cache)[: max(0, len(cache) - SCAN_CACHE_MAX)]:  # least recently used first
+        del cache[k]
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": PARSER_VERSION, "entries": cache}, f, separators=(",", ":"))
+        os.replace(tmp, path)  # atomic, so concurrent jobs never see a half-written cache
+    except OSError:
+        pass
+
+# Summarize files, reusing cached summaries for unchanged files; only misses go to the process pool.
+def _summarize(files: List[str], cache_path: str) -> List[Dict]:
+    cache = _load_scan_cache(cache_path)
+    keys: Dict[str, str] = {}
+    for fp in files:
+        try:
+            keys[fp] = _content_key(fp)
+        except OSError:
+            continue
+        if keys[fp] in cache:
+            cache[keys[fp]] = cache.pop(keys[fp])  # mark as recently used
+    misses = [fp for fp in keys if keys[fp] not in cache]
+
+    if misses:
+        # parse files in parallel; unreadable/unparseable files come back as None and are dropped
+        workers = max(1, min(os.cpu_count() or 1, len(misses)))
+        added = False
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for fp, s in zip(misses, ex.map(summarize_java_safe, misses, chunksize=4)):
+                if s:
+                    cache[keys[fp]] = {k: v for k, v in s.items() if k != "file"}
+                    added = True
+        if added:  # all hits (or nothing parseable): the file on disk is still current
+            _save_scan_cache(cache_path, cache)
+
+    return [dict(cache[keys[fp]], file=fp) for fp in keys if keys[fp] in cache]
+
 # From a list of Java file summaries, pick up to limit targets as (package, className) pairs.
 def _pick_targets(summaries: List[Dict], limit: int = 6) -> List[Tuple[str, str]]:
     picked = []
@@ -18,10 +99,20 @@ def _pick_targets(summaries: List[Dict], limit: int = 6) -> List[Tuple[str, str]
 
 """Runs the whole build flow: clones the repo, scans Java, optionally uses CrewAI to generate tests (unit or BDD), 
    falls back to a simple scaffold if AI isn’t available, then zips everything and returns the ZIP path.  """
-def run_pipeline(opts: BuildOptions, job_progress_cb, base_dir: str) -> str:
+def run_pipeline(opts: PipelineOptions, job_progress_cb, base_dir: str) -> str:
     work = os.path.join(base_dir, "work", opts.job_id)
     os.makedirs(work, exist_ok=True)
 
+    # If an API key is present, REQUIRE CrewAI to run (no silent fallback).
+    ai_required = bool(opts.api_key)
+
+    # importing crewai/langchain takes seconds; do it while the (network-bound) clone runs
+    preload = None
+    if ai_required:
+        from .crewai_pipeline import preload_crewai
+        preload = threading.Thread(target=preload_crewai, name=f"preload-{opts.job_id}", daemon=True)
+        preload.start()
+
     job_progress_cb(5, "Fetching repository")
     repo = shallow_clone(opts.github_url, work)
 
@@ -30,12 +121,24 @@ def run_pipeline(opts: BuildOptions, job_progress_cb, base_dir: str) -> str:
     if not files:
         raise RuntimeError("No Java files found in the repository.")
 
+    # the process pool below may fork; don't fork while another thread is halfway through an import
+    if preload is not None:
+        preload.join()
+
+    # only the best-ranked files can reach the context bundle, so only those are parsed
+    batch = sorted(files, key=lambda fp: _source_rank(fp, repo))[: CONTEXT_FILES * 2]
+
+    parsed = _summarize(batch, os.path.join(base_dir, "work", SCAN_CACHE_NAME))
+
+    # drop repeated (package, class) pairs, e.g. the same class copied into several modules
     summaries: List[Dict] = []
-    for fp in files[:200]:
-        try:
-            summaries.append(summarize_java(fp))
-        except Exception:
+    seen = set()
+    for s in parsed:
+        key = (s.get("package"), s.get("class"))
+        if s.get("class") and key in seen:
             continue
+        seen.add(key)
+        summaries.append(s)
 
     # radio semantics
     do_unit = bool(opts.generate_unit) and not bool(opts.generate_bdd)
@@ -46,16 +149,14 @@ def run_pipeline(opts: BuildOptions, job_progress_cb, base_dir: str) -> str:
     out_root = os.path.join(work, "generated-tests")
     os.makedirs(out_root, exist_ok=True)
 
-    # If an API key is present, REQUIRE CrewAI to run (no silent fallback).
     used_ai = False
-    ai_required = bool(os.environ.get("OPENAI_API_KEY"))
     try:
         from .crewai_pipeline import build_context_bundle, run_crewai_generation
         job_progress_cb(55, "CrewAI generation")
-        ctx = build_context_bundle(summaries, max_files=32, per_file_chars=1500)
+        ctx = build_context_bundle(summaries, max_files=CONTEXT_FILES, per_file_chars=1500)
 
         # optionally include uploaded requirement file
-        if getattr(opts, "requirement_path", None):
+        if opts.requirement_path:
             try:
                 with open(opts.requirement_path, "r", encoding="utf-8", errors="ignore") as f:
                     req = f.read()
@@ -70,7 +171,8 @@ def run_pipeline(opts: BuildOptions, job_progress_cb, base_dir: str) -> str:
             model=opts.llm_model or "gpt-4o-mini",
             out_dir=out_root,
             do_unit=do_unit,
-            do_bdd=do_bdd
+            do_bdd=do_bdd,
+            api_key=opts.api_key,
         )
         used_ai = count > 0
     except Exception as e:
@@ -126,3 +228,61 @@ def run_pipeline(opts: BuildOptions, job_progress_cb, base_dir: str) -> str:
 
     job_progress_cb(100, "Complete")
     return zip_path
+
+# Process-pool entry points: main.py runs every job in a worker process, which reports back through
+# a queue handed to init_worker as (job_id, kind, *args) events, in order:
+#   ("start",), ("progress", pct, status, message)..., then ("done", zip_path) or ("error", message)
+_event_queue = None
+
+def init_worker(queue) -> None:
+    global _event_queue
+    _event_queue = queue
+
+def run_pipeline_job(opts: PipelineOptions, base_dir: str) -> None:
+    def post(*event):
+        _event_queue.put((opts.job_id, *event))
+
+    def progress(pct: int, status: str, message: str = ""):
+        post("progress", pct, status, message)
+
+    post("start")
+    try:
+        zip_path = run_pipeline(opts, job_progress_cb=progress, base_dir=base_dir)
+    except Exception as e:
+        post("error", str(e))
+        return
+    post("done", zip_path)
+
+# Command-line entry point: runs the same pipeline without the web server, e.g. from backend/:
+#   python -m agent.orchestrator https://github.com/owner/repo [--bdd]
+# The scan/materialize path is plain Python + re, so it can also be run with pypy3 (dependencies installed there).
+def _main(argv=None) -> int:
+    import argparse, uuid
+    ap = argparse.ArgumentParser(
+        prog="python -m agent.orchestrator",
+        description="Generate tests for a GitHub repo and print the ZIP path.",
+    )
+    ap.add_argument("github_url")
+    ap.add_argument("--bdd", action="store_true", help="generate a Cucumber BDD suite instead of unit tests")
+    ap.add_argument("--prompt", default="")
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--base-dir", default=os.getcwd(), help="folder that receives work/ and artifacts/")
+    args = ap.parse_args(argv)
+
+    opts = PipelineOptions(
+        job_id=str(uuid.uuid4()),
+        github_url=args.github_url,
+        prompt=args.prompt,
+        llm_model=args.model,
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        generate_unit=not args.bdd,
+        generate_bdd=args.bdd,
+    )
+    def _print_progress(pct: int, status: str, message: str = ""):
+        print(f"[{pct:3d}%] {message or status}", flush=True)
+
+    print(run_pipeline(opts, job_progress_cb=_print_progress, base_dir=args.base_dir))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -18,21 +18,32 @@ def shallow_clone(github_url: str, work_dir: str) -> str:
         owner, repo = base
         for branch in ["main", "master"]:
             zip_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/{branch}.zip"
-            r = requests.get(zip_url, timeout=60)
-            if r.status_code == 200:
-                zip_path = os.path.join(work_dir, f"{repo}-{branch}.zip")
+            zip_path = os.path.join(work_dir, f"{repo}-{branch}.zip")
+            # stream the archive to disk instead of holding it in memory
+            with requests.get(zip_url, stream=True, timeout=60) as r:
+                if r.status_code != 200:
+                    continue
                 with open(zip_path, "wb") as fz:
-                    fz.write(r.content)
-                with zipfile.ZipFile(zip_path, "r") as z:
-                    z.extractall(work_dir)
-                extracted = os.path.join(work_dir, f"{repo}-{branch}")
-                if os.path.isdir(extracted):
-                    for name in os.listdir(extracted):
-                        shutil.move(os.path.join(extracted, name), os.path.join(repo_dir, name))
-                    shutil.rmtree(extracted)
-                    return repo_dir
+                    for chunk in r.iter_content(chunk_size=1 << 20):
+                        fz.write(chunk)
+            if _extract_stripped(zip_path, f"{repo}-{branch}/", repo_dir):
+                return repo_dir
         raise RuntimeError("Failed to fetch repository via GitHub zip fallback")
 
+# Extract the members under 'prefix' (GitHub's "<repo>-<branch>/" top folder) straight into dest,
+# without the prefix. Returns False if the archive has no such folder.
+def _extract_stripped(zip_path: str, prefix: str, dest: str) -> bool:
+    found = False
+    with zipfile.ZipFile(zip_path, "r") as z:
+        for info in z.infolist():
+            if not info.filename.startswith(prefix):
+                continue
+            found = True
+            info.filename = info.filename[len(prefix):]
+            if info.filename:
+                z.extract(info, dest)  # extract() sanitizes absolute paths and ".." parts
+    return found
+
 def _extract_owner_repo(url: str):
     m = re.search(r"github\.com/([^/]+)/([^/]+)", url)
     if not m:
@@ -0,0 +1,45 @@
+import os, threading
+from collections import OrderedDict
+from typing import Tuple
+
+# Within one job the same source file is read by several tools (java_outline, grep, read_text, ...).
+# Reads go through an LRU keyed by (path, mtime_ns, size), so a file that changes or is re-cloned
+# simply becomes a new key. The LRU holds at most MAX_CACHE_BYTES of contents per process (evicting
+# the least recently used files), and large files bypass it entirely.
+MAX_CACHED_FILE_BYTES = 256 * 1024
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_cache: "OrderedDict[Tuple[str, int, int], bytes]" = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+def read_bytes_cached(path: str, mtime_ns: int, size: int) -> bytes:
+    global _cache_bytes
+    key = (path, mtime_ns, size)
+    with _lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+            return data
+    with open(path, "rb") as f:  # read outside the lock; two threads may race on one miss, harmlessly
+        data = f.read()
+    with _lock:
+        if key not in _cache:
+            _cache[key] = data
+            _cache_bytes += len(data)
+            while _cache_bytes > MAX_CACHE_BYTES:
+                _cache_bytes -= len(_cache.popitem(last=False)[1])
+    return data
+
+def read_bytes(path) -> bytes:
+    """Contents of path, served from the cache while its mtime/size are unchanged."""
+    path = os.fspath(path)
+    st = os.stat(path)
+    if st.st_size > MAX_CACHED_FILE_BYTES:
+        with open(path, "rb") as f:
+            return f.read()
+    return read_bytes_cached(path, st.st_mtime_ns, st.st_size)
+
+def read_text_cached(path) -> str:
+    """read_bytes() decoded as UTF-8, ignoring undecodable bytes (like the tools always did)."""
+    return read_bytes(path).decode("utf-8", errors="ignore")
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
 import fnmatch
+import functools
+import io
+import mmap
+import os
 import pathlib
 import re
 import subprocess
-from typing import List, Optional, Dict, Any, Type
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Dict, Any, Tuple, Type
+
+try:  # regex parser used to pull required literals out of grep patterns
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+try:  # C-backed Java parser for JavaOutlineTool; without it the outline falls back to regexes
+    import tree_sitter_java
+    from tree_sitter import Language, Parser
+    _JAVA_LANGUAGE = Language(tree_sitter_java.language())
+except Exception:
+    _JAVA_LANGUAGE = None
 
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field, field_validator
 
+from ._fs_cache import read_bytes, read_text_cached
+
 
 # ---------------------------- Pydantic Schemas ----------------------------
 #This module defines a toolkit of CrewAI tools (each a BaseTool) that help an agent analyze Java/Spring repositories
@@ -135,9 +155,11 @@ class GitChurnInput(BaseModel):
     Attributes:
         repo_root: Path to a git repository root (directory containing .git/).
         since: A date/range understood by git, e.g., '90 days ago' or '2024-01-01'.
+        max_count: Optional cap on the number of (newest) commits read, to bound work on long histories.
     """
     repo_root: str = Field(description="Git repo root")
     since: str = Field(description="e.g., '90 days ago' or '2024-01-01'")
+    max_count: Optional[int] = Field(default=None, description="Only read the newest N commits (all if omitted)")
 
     @field_validator('repo_root')
     @classmethod
@@ -154,6 +176,13 @@ class GitChurnInput(BaseModel):
             raise ValueError("since must be a non-empty string")
         return v
 
+    @field_validator('max_count')
+    @classmethod
+    def _max_count_positive(cls, v: Optional[int]) -> Optional[int]:
+        if v is not None and v < 1:
+            raise ValueError("max_count must be a positive integer")
+        return v
+
 
 class GitBlameInput(BaseModel):
     """
@@ -181,6 +210,493 @@ class GitBlameInput(BaseModel):
         return v
 
 
+# ------------------------------- Walk / Glob Helpers -------------------------------
+
+def _walk(root: str, prune: Optional[re.Pattern] = None) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Depth-first os.scandir walk yielding (relative POSIX path, DirEntry) for every entry below root.
+
+    Directories are yielded too; they are not descended into when `prune` matches "<rel>/",
+    which must imply that every path inside them is ignored anyway (see _compile_prunes).
+    Symlinked directories are not followed (same as pathlib's rglob).
+    """
+    stack = [(root, "")]
+    while stack:
+        folder, prefix = stack.pop()
+        try:
+            it = os.scandir(folder)
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                rel = prefix + entry.name
+                yield rel, entry
+                if entry.is_dir(follow_symlinks=False) and not (prune and prune.match(rel + "/")):
+                    subdirs.append((entry.path, rel + "/"))
+        stack.extend(reversed(subdirs))
+
+
+def _glob_segment_to_regex(seg: str) -> str:
+    """Translate one path segment of a glob; wildcards never cross '/'."""
+    out, i, n = [], 0, len(seg)
+    while i < n:
+        c = seg[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            # character class, parsed like fnmatch: "[!...]" negates, a leading "]" is literal
+            j = i
+            if j < n and seg[j] == "!":
+                j += 1
+            if j < n and seg[j] == "]":
+                j += 1
+            j = seg.find("]", j)
+            if j == -1:
+                out.append("\\[")
+                continue
+            body = seg[i:j].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            elif body.startswith("^"):
+                body = "\\" + body
+            out.append(f"[{body}]")
+            i = j + 1
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def _rglob_to_regex(pattern: str) -> str:
+    """
+    Regex (for .fullmatch on a relative POSIX path) equivalent to pathlib's Path.rglob(pattern),
+    i.e. glob("**/" + pattern): '**' spans zero or more folders, '*' and '?' stay within one segment.
+    A trailing '**' matches everything below that point.
+    """
+    segs = [s for s in ("**/" + pattern.replace("\\", "/")).split("/") if s]
+    parts = []
+    for k, seg in enumerate(segs):
+        last = k == len(segs) - 1
+        if seg == "**":
+            parts.append("(?:[^/]+/)*[^/]+" if last else "(?:[^/]+/)*")
+        else:
+            parts.append(_glob_segment_to_regex(seg) + ("" if last else "/"))
+    return "".join(parts)
+
+
+# Case-insensitive matching on Windows, like pathlib.glob and fnmatch.fnmatch there.
+_GLOB_CASE = re.IGNORECASE if os.name == "nt" else 0
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_rglobs(patterns: Tuple[str, ...]) -> re.Pattern:
+    """One compiled regex (use .fullmatch) matching any of the rglob patterns; cached across tool calls."""
+    return re.compile("|".join(f"(?:{_rglob_to_regex(p)})" for p in patterns), _GLOB_CASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_ignores(globs: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """One compiled regex (use .match) matching any of the fnmatch-style ignore globs, or None if empty."""
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in globs), _GLOB_CASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_prunes(globs: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """
+    Regex (use .match on "<rel>/") telling _walk which folders it can skip, or None.
+
+    Only globs ending in '*' qualify: fnmatch's '*' also spans '/', so once such a glob matches
+    "<rel>/" it matches every path below that folder too. Any other glob (e.g. "src/?" or "*[!a]")
+    can match the folder without matching all of its contents, so those folders are walked and
+    their entries filtered one by one.
+    """
+    return _compile_ignores(tuple(g for g in globs if g.endswith("*")))
+
+
+# Pattern constructs that can behave differently on a whole buffer than on a single line
+# (\A, \Z, lookarounds peeking across the line edge, atomic groups and possessive quantifiers that
+# won't backtrack out of a match running past the line end); such patterns are always matched line by line.
+# Conservative: an escaped "\++" is caught too, which only costs it the fast path.
+_LINE_ONLY_SYNTAX = re.compile(r"\\[AZ]|\(\?<?[=!]|\(\?>|[*+?}]\+")
+# ASCII bytes that send a buffer down the decode path: line breaks other than \n that str.splitlines()
+# honours (\r, \v, \f, \x1c-\x1e), and \x1f, which a str pattern's \s matches but a bytes pattern's doesn't.
+_STR_ONLY_BYTES = re.compile(rb"[\r\v\f\x1c-\x1f]")
+
+
+def _bytes_twin(rx: re.Pattern) -> Optional[re.Pattern]:
+    """Bytes version of rx (plus re.M) for whole-buffer prescans, or None if it can't stand in for per-line matching."""
+    pat = rx.pattern
+    if not isinstance(pat, str) or not pat.isascii() or _LINE_ONLY_SYNTAX.search(pat):
+        return None
+    try:
+        return re.compile(pat.encode("ascii"), (rx.flags & re.IGNORECASE) | re.M)
+    except re.error:
+        return None
+
+
+def _required_literal(rx: re.Pattern) -> Optional[bytes]:
+    """
+    Longest run of literal characters every match of rx must contain, UTF-8 encoded (lowercased when
+    rx ignores case), or None. Only the top-level sequence and plain groups are inspected.
+    """
+    try:
+        items = list(_sre_parse.parse(rx.pattern, rx.flags & ~re.UNICODE))
+    except Exception:
+        return None
+    best, run = "", []
+    stack = [iter(items)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        op, av = item
+        if op is _sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is _sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            stack.append(iter(av[3]))  # a group without scoped flags: its contents continue the sequence
+            continue
+        best, run = max(best, "".join(run), key=len), []
+    best = max(best, "".join(run), key=len)
+    if not best:
+        return None
+    if rx.flags & re.IGNORECASE:
+        # outside ASCII, case folding maps e.g. 'ſ' to 's'; only plain ASCII needles can be lowercased safely
+        return best.lower().encode("ascii") if best.isascii() else None
+    return best.encode("utf-8")
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    if isinstance(buf, bytes):
+        return buf.count(b"\n", start, end)
+    # mmap has no count(); count in bounded slices so a long gap between hits never copies much at once
+    return sum(buf[i:min(i + (1 << 20), end)].count(b"\n") for i in range(start, end, 1 << 20))
+
+
+def _scan_lines(buf, name: str, rx: re.Pattern, rx_b: re.Pattern) -> List[Dict[str, str]]:
+    """
+    GrepTool hits in an ASCII buffer (bytes or mmap) whose only line break is \\n: rx_b finds
+    candidate lines, which are decoded and checked with rx; line numbers are counted incrementally.
+    """
+    hits: List[Dict[str, str]] = []
+    n, pos, line_no, counted = len(buf), 0, 1, 0
+    while pos <= n:
+        m = rx_b.search(buf, pos)
+        if m is None:
+            break
+        start = buf.rfind(b"\n", 0, m.start()) + 1
+        if start >= n:  # past the last line (splitlines() yields no trailing empty line)
+            break
+        end = buf.find(b"\n", start)
+        if end == -1:
+            end = n
+        line = buf[start:end].decode("ascii")
+        if rx.search(line):
+            line_no += _count_newlines(buf, counted, start)
+            counted = start
+            hits.append({"file": name, "line_no": str(line_no), "line": line.strip()})
+        pos = end + 1
+    return hits
+
+
+# Files at least this large are grepped through a read-only mmap instead of being read into memory.
+MMAP_MIN_BYTES = 1 << 20
+# Directory searches skip files that are too big or obviously binary (build output, archives, images).
+GREP_MAX_FILE_BYTES = 8 * 1024 * 1024
+GREP_SKIP_EXTENSIONS = frozenset({
+    ".jar", ".war", ".ear", ".class", ".zip", ".so", ".dll", ".exe",
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".woff", ".woff2",
+})
+_BINARY_SNIFF_BYTES = 4096  # a NUL byte in this prefix marks a file as binary
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def _grep_candidate(entry: os.DirEntry) -> bool:
+    """Whether a walked file is worth grepping: not a known binary extension, not over the size cap."""
+    if os.path.splitext(entry.name)[1].lower() in GREP_SKIP_EXTENSIONS:
+        return False
+    try:
+        return entry.stat().st_size <= GREP_MAX_FILE_BYTES
+    except OSError:
+        return False
+
+
+def _grep_mapped(
+    f: pathlib.Path, rx: re.Pattern, rx_b: re.Pattern, needle: Optional[bytes], skip_binary: bool = False
+) -> Optional[List[Dict[str, str]]]:
+    """_grep_file's ASCII fast path over an mmap of f, or None when the file needs the decoding path."""
+    with open(f, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if skip_binary and mm.find(b"\0", 0, _BINARY_SNIFF_BYTES) != -1:
+            return []
+        if _NON_ASCII.search(mm):
+            return None
+        if needle is not None:
+            if rx.flags & re.IGNORECASE:
+                found = re.search(re.escape(needle), mm, re.IGNORECASE) is not None
+            else:
+                found = mm.find(needle) != -1
+            if not found:
+                return []
+        if _STR_ONLY_BYTES.search(mm):  # \r included: CRLF needs a normalised copy
+            return None
+        return _scan_lines(mm, str(f), rx, rx_b)
+
+
+def _grep_file(
+    f: pathlib.Path,
+    rx: re.Pattern,
+    rx_b: Optional[re.Pattern] = None,
+    needle: Optional[bytes] = None,
+    skip_binary: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Matching lines of one file as GrepTool result dicts; unreadable files yield nothing.
+
+    ASCII files that lack `needle` (see _required_literal) are skipped without running the regex.
+    Other ASCII files are prescanned as one bytes buffer with rx_b, so only lines where it hits get
+    decoded and re-checked with rx; non-ASCII files fall back to decoding and searching every line.
+    Files of MMAP_MIN_BYTES or more take the ASCII path straight from an mmap.
+    With skip_binary, files with a NUL byte in their first _BINARY_SNIFF_BYTES yield nothing.
+    """
+    try:
+        if rx_b is not None and os.stat(f).st_size >= MMAP_MIN_BYTES:
+            hits = _grep_mapped(f, rx, rx_b, needle, skip_binary)
+            if hits is not None:
+                return hits
+        data = read_bytes(f)
+    except Exception:
+        return []
+    if skip_binary and data.find(b"\0", 0, _BINARY_SNIFF_BYTES) != -1:
+        return []
+    name = str(f)
+    ascii_only = data.isascii()
+
+    if needle is not None and ascii_only:
+        haystack = data.lower() if rx.flags & re.IGNORECASE else data
+        if needle not in haystack:
+            return []
+
+    if rx_b is not None and ascii_only:
+        buf = data.replace(b"\r\n", b"\n") if b"\r" in data else data
+        if not _STR_ONLY_BYTES.search(buf):
+            return _scan_lines(buf, name, rx, rx_b)
+
+    text = data.decode("utf-8", errors="ignore")
+    return [
+        {"file": name, "line_no": str(i), "line": line.strip()}
+        for i, line in enumerate(text.splitlines(), 1)
+        if rx.search(line)
+    ]
+
+
+# ------------------------------- Pom Helpers -------------------------------
+
+_COORD_TAGS = ("groupId", "artifactId", "version")
+_PROP_REF = re.compile(r"\$\{([^}]+)\}")
+# regex fallback for malformed poms
+_POM_COORD_RE = re.compile(r"<(groupId|artifactId|version)>([^<]+)</\1>")
+_POM_DEP_RE = re.compile(
+    r"<dependency>.*?<groupId>([^<]+)</groupId>.*?<artifactId>([^<]+)</artifactId>.*?</dependency>", re.S
+)
+
+
+def _local(tag: str) -> str:
+    """Element tag without its '{namespace}' prefix."""
+    return tag.rpartition("}")[2]
+
+
+def _parse_pom(pom_path: str) -> Dict[str, Any]:
+    """
+    Stream pom.xml through the C-accelerated ElementTree parser. Coordinates come from the
+    project's own tags, falling back to <parent> for groupId/version, and ${...} references to
+    <properties> or project.* are resolved. Raises ET.ParseError for malformed XML.
+    """
+    top: Dict[str, str] = {}
+    parent: Dict[str, str] = {}
+    props: Dict[str, str] = {}
+    deps: List[Tuple[str, str]] = []
+    path: List[str] = []
+    for event, el in ET.iterparse(io.BytesIO(read_bytes(pom_path)), events=("start", "end")):
+        if event == "start":
+            path.append(_local(el.tag))
+            continue
+        tag, depth = path.pop(), len(path)
+        if depth == 1 and tag in _COORD_TAGS:
+            top[tag] = (el.text or "").strip()
+        elif depth == 2 and path[1] == "parent" and tag in _COORD_TAGS:
+            parent[tag] = (el.text or "").strip()
+        elif depth == 2 and path[1] == "properties":
+            props[tag] = (el.text or "").strip()
+        elif tag == "dependency":
+            g = (el.findtext("{*}groupId") or "").strip()
+            a = (el.findtext("{*}artifactId") or "").strip()
+            if g and a:
+                deps.append((g, a))
+            el.clear()
+        if depth == 1:
+            el.clear()  # a finished top-level section is no longer needed
+
+    coords = {
+        "groupId": top.get("groupId") or parent.get("groupId") or None,
+        "artifactId": top.get("artifactId") or None,
+        "version": top.get("version") or parent.get("version") or None,
+    }
+    for k, v in coords.items():
+        if v is not None:
+            props.setdefault(f"project.{k}", v)
+            props.setdefault(f"pom.{k}", v)
+
+    def resolve(v: str) -> str:
+        return _PROP_REF.sub(lambda m: props.get(m.group(1), m.group(0)), v) if "${" in v else v
+
+    return {
+        "coords": {k: resolve(v) if v is not None else None for k, v in coords.items()},
+        "deps": [(resolve(g), resolve(a)) for g, a in deps],
+    }
+
+
+def _scan_pom_text(text: str) -> Dict[str, Any]:
+    """
+    Regex fallback for poms that aren't well-formed XML: the first groupId/artifactId/version outside
+    any <dependency> block, found in a single pass; no ${...} resolution.
+    """
+    def dep_block(pos: int) -> Tuple[int, int]:
+        """(start, end) of the next <dependency> block at or after pos, or (-1, -1)."""
+        start = text.find("<dependency>", pos)
+        if start == -1:
+            return -1, -1
+        end = text.find("</dependency>", start)
+        return start, len(text) if end == -1 else end
+
+    coords: Dict[str, Optional[str]] = dict.fromkeys(_COORD_TAGS)
+    missing = len(coords)
+    dep_start, dep_end = dep_block(0)
+    for m in _POM_COORD_RE.finditer(text):
+        while dep_start != -1 and m.start() > dep_end:
+            dep_start, dep_end = dep_block(dep_end)
+        if dep_start != -1 and dep_start < m.start() < dep_end:
+            continue
+        tag = m.group(1)
+        if coords[tag] is None:
+            coords[tag] = m.group(2)
+            missing -= 1
+            if not missing:
+                break
+    return {"coords": coords, "deps": _POM_DEP_RE.findall(text)}
+
+
+# ------------------------------- Java Outline Helpers -------------------------------
+
+_JAVA_PKG_RE = re.compile(r"^\s*package\s+([a-zA-Z0-9_.]+)\s*;", re.M)
+_JAVA_CLASS_RE = re.compile(r"(?:@[\w.()\"',\s]+)?\s*(public|protected|private)?\s*(final|abstract)?\s*class\s+(\w+)")
+_JAVA_METHOD_RE = re.compile(r"(@\w[\w.()\"',\s]*)?\s+public\s+[<>\w\[\]?.,\s]+?\s+(\w+)\s*\(")
+_JAVA_ANNO_RE = re.compile(r"@\w+")
+_REST_ANNOTATIONS = ("@RestController", "@Controller", "@GetMapping", "@PostMapping")
+
+
+def _outline_java_tree(src: bytes) -> Tuple[Optional[str], List[str], List[str], set]:
+    """(package, class names, public method names, annotations) from a tree-sitter parse of src."""
+    tree = Parser(_JAVA_LANGUAGE).parse(src)  # parsers aren't thread-safe, and are cheap to create
+
+    def text(node) -> str:
+        return src[node.start_byte:node.end_byte].decode("utf-8", errors="ignore")
+
+    pkg: Optional[str] = None
+    classes: List[str] = []
+    methods: List[str] = []
+    annos: set = set()
+    cursor = tree.walk()
+    while True:
+        node = cursor.node
+        kind = node.type
+        if kind == "package_declaration" and pkg is None:
+            name = next((c for c in node.children if c.type in ("scoped_identifier", "identifier")), None)
+            pkg = text(name) if name is not None else None
+        elif kind == "class_declaration":
+            name = node.child_by_field_name("name")
+            if name is not None:
+                classes.append(text(name))
+        elif kind == "method_declaration":
+            mods = next((c for c in node.children if c.type == "modifiers"), None)
+            name = node.child_by_field_name("name")
+            if name is not None and mods is not None and any(m.type == "public" for m in mods.children):
+                methods.append(text(name))
+        elif kind in ("annotation", "marker_annotation"):
+            name = node.child_by_field_name("name")
+            if name is not None:
+                annos.add("@" + text(name).rpartition(".")[2])  # @org.x.Foo -> @Foo
+        if cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return pkg, classes, methods, annos
+
+
+def _outline_java_regex(src: str) -> Tuple[Optional[str], List[str], List[str], set]:
+    """Regex version of _outline_java_tree: shallower, also matches inside comments and strings."""
+    pkg = _JAVA_PKG_RE.search(src)
+    return (
+        pkg.group(1) if pkg else None,
+        [c[2] for c in _JAVA_CLASS_RE.findall(src)],
+        [m[1] for m in _JAVA_METHOD_RE.findall(src)],
+        set(_JAVA_ANNO_RE.findall(src)),
+    )
+
+
+# ------------------------------- Git Helpers -------------------------------
+
+# First line of each blame group in `git blame --porcelain`: "<sha> <orig line> <final line> [<group size>]"
+_BLAME_HEADER = re.compile(r"([0-9a-f]{40}(?:[0-9a-f]{24})?) \d+ \d+")
+
+
+@functools.lru_cache(maxsize=64)
+def _resolve_head(repo_root: str) -> str:
+    """Commit sha of HEAD, resolved once per repo: every job works on its own fresh clone, whose HEAD never moves."""
+    return subprocess.run(
+        ["git", "-C", repo_root, "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+@functools.lru_cache(maxsize=256)
+def _blame_author_counts(repo_root: str, file: str, head: str, mtime_ns: int, size: int) -> Tuple[Tuple[str, int], ...]:
+    """
+    (author, line count) pairs for a file, most lines first. Uses `git blame --porcelain`, which
+    names each commit's author only once, and streams it; head/mtime_ns/size only key the cache.
+    Raises on git failure so errors aren't cached.
+    """
+    lines_per_commit: Dict[str, int] = {}
+    author_of: Dict[str, str] = {}
+    cmd = ["git", "-C", repo_root, "blame", "--porcelain", file]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, bufsize=1 << 20) as proc:
+        try:
+            sha = ""
+            for line in proc.stdout:
+                if line.startswith("\t"):
+                    continue  # source line
+                m = _BLAME_HEADER.match(line)
+                if m:
+                    sha = m.group(1)
+                    lines_per_commit[sha] = lines_per_commit.get(sha, 0) + 1
+                elif line.startswith("author ") and sha not in author_of:
+                    author_of[sha] = line[len("author "):].strip()
+        except BaseException:
+            proc.kill()
+            raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    counts: Dict[str, int] = {}
+    for sha, n in lines_per_commit.items():
+        author = author_of.get(sha, "")
+        counts[author] = counts.get(author, 0) + n
+    return tuple(sorted(counts.items(), key=lambda x: -x[1]))
+
+
 # ------------------------------- Tool Classes -------------------------------
 # Identifies files based on the pattern (**/*.java)
 class RepoGlobTool(BaseTool):
@@ -198,13 +714,14 @@ class RepoGlobTool(BaseTool):
         root = kwargs["root"]
         patterns = kwargs["patterns"]
         ignore = kwargs.get("ignore", [])
-        rootp = pathlib.Path(root)
+        # One pass over the tree for all patterns; ignored folders are pruned instead of walked and filtered.
+        match_re = _compile_rglobs(tuple(patterns))
+        ignore_re = _compile_ignores(tuple(ignore))
         out: List[str] = []
-        for pat in patterns:
-            for p in rootp.rglob(pat):
-                rel = str(p.relative_to(rootp)).replace("\\", "/")
-                if any(fnmatch.fnmatch(rel, ig) for ig in ignore):
-                    continue
+        for rel, entry in _walk(root, prune=_compile_prunes(tuple(ignore))):
+            if ignore_re and ignore_re.match(rel):
+                continue
+            if match_re.fullmatch(rel):
                 out.append(rel)
         return sorted(out)
 
@@ -226,7 +743,7 @@ class ReadTextTool(BaseTool):
 
     def _run(self, **kwargs) -> str:
         path = kwargs["path"]
-        return pathlib.Path(path).read_text(encoding="utf-8", errors="ignore")
+        return read_text_cached(path)
 
     def run(self, *args, **kw):
         return self._run(**kw)
@@ -236,6 +753,9 @@ class GrepTool(BaseTool):
     """
     Regex search across a file or recursively within a directory.
 
+    Directory searches skip binary files (NUL in the first 4 KiB, or a GREP_SKIP_EXTENSIONS
+    extension) and files over GREP_MAX_FILE_BYTES; a single file path is always searched.
+
     Input flags:
         - 'i' → re.IGNORECASE
 
@@ -255,17 +775,15 @@ class GrepTool(BaseTool):
         rx = re.compile(pattern, fl)
         result: List[Dict[str, str]] = []
         p = pathlib.Path(path)
-        files = [p] if p.is_file() else list(p.rglob("*"))
-        for f in files:
-            if not f.is_file():
-                continue
-            try:
-                text = f.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
-                continue
-            for i, line in enumerate(text.splitlines(), 1):
-                if rx.search(line):
-                    result.append({"file": str(f), "line_no": str(i), "line": line.strip()})
+        rx_b = _bytes_twin(rx)
+        needle = _required_literal(rx)
+        if p.is_file():
+            return _grep_file(p, rx, rx_b, needle)
+        files = [pathlib.Path(e.path) for _, e in _walk(str(p)) if e.is_file() and _grep_candidate(e)]
+        # reads overlap with scanning; map() keeps results in file order
+        with ThreadPoolExecutor() as ex:
+            for hits in ex.map(lambda f: _grep_file(f, rx, rx_b, needle, skip_binary=True), files):
+                result.extend(hits)
         return result
 
     def run(self, *args, **kw):
@@ -284,7 +802,8 @@ class JavaOutlineTool(BaseTool):
         - Convenience booleans: has_transactional, has_scheduled, has_rest
 
     Note:
-        This is regex-based and intentionally shallow; not a complete parser.
+        Uses the tree-sitter Java grammar when installed (linear time, ignores comments/strings);
+        otherwise falls back to shallow regexes.
     """
     name: str = "java_outline"
     description: str = "Very light outline for a Java file (package, classes, public methods, annotations)."
@@ -292,19 +811,19 @@ class JavaOutlineTool(BaseTool):
 
     def _run(self, **kwargs) -> Dict[str, Any]:
         path = kwargs["path"]
-        src = pathlib.Path(path).read_text(encoding="utf-8", errors="ignore")
-        pkg = re.search(r"^\s*package\s+([a-zA-Z0-9_.]+)\s*;", src, re.M)
-        classes = re.findall(r"(?:@[\w.()\"',\s]+)?\s*(public|protected|private)?\s*(final|abstract)?\s*class\s+(\w+)", src)
-        methods = re.findall(r"(@\w[\w.()\"',\s]*)?\s+public\s+[<>\w\[\]?.,\s]+?\s+(\w+)\s*\(", src)
-        annos = list(set(re.findall(r"@\w+", src)))
+        data = read_bytes(path)
+        if _JAVA_LANGUAGE is not None:
+            pkg, classes, methods, annos = _outline_java_tree(data)
+        else:
+            pkg, classes, methods, annos = _outline_java_regex(data.decode("utf-8", errors="ignore"))
         return {
-            "package": pkg.group(1) if pkg else None,
-            "classes": [c[2] for c in classes],
-            "public_methods": [m[1] for m in methods],
-            "annotations": annos,
+            "package": pkg,
+            "classes": classes,
+            "public_methods": methods,
+            "annotations": list(annos),
             "has_transactional": "@Transactional" in annos,
             "has_scheduled": "@Scheduled" in annos,
-            "has_rest": any(a in annos for a in ["@RestController", "@Controller", "@GetMapping", "@PostMapping"]),
+            "has_rest": any(a in annos for a in _REST_ANNOTATIONS),
         }
 
     def run(self, *args, **kw):
@@ -325,7 +844,8 @@ class MavenCoordsTool(BaseTool):
         }
 
     Caveat:
-        Uses regex, so it won't resolve ${properties}, parents, or profiles.
+        Resolves ${properties} defined in the same pom and inherits groupId/version from <parent>,
+        but doesn't read parent poms or profiles. Malformed XML falls back to a plain regex scan.
     """
     name: str = "maven_coords"
     description: str = "Parse a pom.xml for groupId, artifactId, version, and Spring Boot starters."
@@ -333,18 +853,14 @@ class MavenCoordsTool(BaseTool):
 
     def _run(self, **kwargs) -> Dict[str, Any]:
         pom_path = kwargs["pom_path"]
-        text = pathlib.Path(pom_path).read_text(encoding="utf-8", errors="ignore")
-        g = re.search(r"<groupId>([^<]+)</groupId>", text)
-        a = re.search(r"<artifactId>([^<]+)</artifactId>", text)
-        v = re.search(r"<version>([^<]+)</version>", text)
-        deps = re.findall(
-            r"<dependency>.*?<groupId>([^<]+)</groupId>.*?<artifactId>([^<]+)</artifactId>.*?</dependency>", text, re.S
-        )
+        try:
+            pom = _parse_pom(pom_path)
+        except ET.ParseError:
+            pom = _scan_pom_text(read_text_cached(pom_path))
+        deps = pom["deps"]
         starters = [f"{x[0]}:{x[1]}" for x in deps if "spring-boot-starter" in x[1]]
         return {
-            "groupId": g.group(1) if g else None,
-            "artifactId": a.group(1) if a else None,
-            "version": v.group(1) if v else None,
+            **pom["coords"],
             "starters": starters,
             "dependencies": [f"{x[0]}:{x[1]}" for x in deps],
         }
@@ -363,6 +879,7 @@ class GitChurnTool(BaseTool):
     Notes:
         - Requires git installed and repo_root to be a git repo.
         - Errors return [] to keep agents resilient.
+        - git's output is parsed line by line as it streams, so long histories aren't held in memory.
     """
     name: str = "git_churn"
     description: str = "Compute churn per file since a given date/range using `git log --numstat`."
@@ -371,24 +888,34 @@ class GitChurnTool(BaseTool):
     def _run(self, **kwargs) -> List[Dict[str, str]]:
         repo_root = kwargs["repo_root"]
         since = kwargs["since"]
+        max_count = kwargs.get("max_count")
         cmd = ["git", "-C", repo_root, "log", f"--since={since}", "--numstat", "--pretty=format:--"]
+        if max_count:
+            cmd.append(f"--max-count={int(max_count)}")
+        churn: Dict[str, int] = {}
+        # parse git's output as it is produced instead of buffering the whole log first
         try:
-            out = subprocess.check_output(cmd, text=True)
+            with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, bufsize=1 << 20) as proc:
+                try:
+                    for line in proc.stdout:
+                        if line.startswith("--") or not line.strip():
+                            continue
+                        parts = line.rstrip("\n").split("\t")
+                        if len(parts) == 3:
+                            add, delete, file = parts
+                            try:
+                                a = int(add) if add.isdigit() else 0
+                                d = int(delete) if delete.isdigit() else 0
+                            except ValueError:
+                                a = d = 0
+                            churn[file] = churn.get(file, 0) + a + d
+                except BaseException:
+                    proc.kill()
+                    raise
+            if proc.returncode != 0:
+                return []
         except Exception:
             return []
-        churn: Dict[str, int] = {}
-        for line in out.splitlines():
-            if line.startswith("--") or not line.strip():
-                continue
-            parts = line.split("\t")
-            if len(parts) == 3:
-                add, delete, file = parts
-                try:
-                    a = int(add) if add.isdigit() else 0
-                    d = int(delete) if delete.isdigit() else 0
-                except ValueError:
-                    a = d = 0
-                churn[file] = churn.get(file, 0) + a + d
         return [{"file": f, "churn": str(v)} for f, v in sorted(churn.items(), key=lambda x: -x[1])]
 
     def run(self, *args, **kw):
@@ -397,13 +924,14 @@ class GitChurnTool(BaseTool):
 # Using git blame, it counts lines per author for a given file and returns the top authors by line count
 class GitBlameTopAuthorsTool(BaseTool):
     """
-    Aggregate top authors for a file using `git blame --line-porcelain`.
+    Aggregate top authors for a file by streaming `git blame --porcelain` (each commit's author is named once).
 
     Returns:
         List of {"author": str, "lines": str} sorted descending by lines.
 
     Notes:
         - Requires git installed; returns [] on failure.
+        - Results are cached per (file, HEAD commit, mtime/size), so repeated calls within a job are free.
     """
     name: str = "git_blame_top_authors"
     description: str = "Top authors by blame count for a given file."
@@ -413,17 +941,12 @@ class GitBlameTopAuthorsTool(BaseTool):
         repo_root = kwargs["repo_root"]
         file = kwargs["file"]
         try:
-            out = subprocess.check_output(
-                ["git", "-C", repo_root, "blame", "--line-porcelain", file], text=True
-            )
+            head = _resolve_head(repo_root)
+            st = os.stat(file if os.path.isabs(file) else os.path.join(repo_root, file))
+            counts = _blame_author_counts(repo_root, file, head, st.st_mtime_ns, st.st_size)
         except Exception:
             return []
-        counts: Dict[str, int] = {}
-        for line in out.splitlines():
-            if line.startswith("author "):
-                author = line[len("author "):].strip()
-                counts[author] = counts.get(author, 0) + 1
-        return [{"author": a, "lines": str(n)} for a, n in sorted(counts.items(), key=lambda x: -x[1])]
+        return [{"author": a, "lines": str(n)} for a, n in counts]
 
     def run(self, *args, **kw):
         return self._run(**kw)
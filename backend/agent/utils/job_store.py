@@ -0,0 +1,59 @@
+import json, os, sqlite3, time
+from typing import Any, Dict, Optional
+
+# Job status shared by every server worker (and kept across restarts) in a small sqlite database.
+# Only the summary fields live here; per-job logs and SSE wake-ups stay in the owning worker's memory.
+# updated_at (epoch seconds) is refreshed on every save, so readers can spot jobs nobody owns any more.
+_COLUMNS = ("status", "progress", "message", "artifact", "flags", "created_at", "updated_at")
+_ready: set = set()
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    if db_path not in _ready:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)  # sqlite won't create missing folders
+    conn = sqlite3.connect(db_path, timeout=5, isolation_level=None)  # autocommit; one short statement per call
+    if db_path not in _ready:
+        conn.execute("PRAGMA journal_mode=WAL")  # readers never block the writer (and vice versa)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT, progress INTEGER,"
+            " message TEXT, artifact TEXT, flags TEXT, created_at TEXT, updated_at REAL)"
+        )
+        try:  # databases created before updated_at existed
+            conn.execute("ALTER TABLE jobs ADD COLUMN updated_at REAL")
+        except sqlite3.OperationalError:
+            pass  # already there
+        _ready.add(db_path)
+    return conn
+
+def save_job(db_path: str, job_id: str, job: Dict[str, Any]) -> None:
+    """Upsert the job's summary fields. Best effort: a storage error never fails the job itself."""
+    row = (job_id, job["status"], job["progress"], job["message"], job.get("artifact"),
+           json.dumps(job.get("flags", {})), job["created_at"], time.time())
+    try:
+        conn = _connect(db_path)
+        try:
+            conn.execute(
+                f"INSERT OR REPLACE INTO jobs (id, {', '.join(_COLUMNS)}) VALUES (?{', ?' * len(_COLUMNS)})", row
+            )
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+def load_job(db_path: str, job_id: str) -> Optional[Dict[str, Any]]:
+    """Summary of a job as stored by save_job, or None if unknown."""
+    if not os.path.isfile(db_path):
+        return None
+    try:
+        conn = _connect(db_path)
+        try:
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    job = dict(zip(_COLUMNS, row))
+    job["flags"] = json.loads(job["flags"] or "{}")
+    job["logs"] = []
+    return job
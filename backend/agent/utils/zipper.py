@@ -1,10 +1,53 @@
 import os, zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def zip_dir(src_dir: str, zip_path: str) -> None:
+# Deflate level for artifacts (0 = store without compression). Generated tests are small text files,
+# so the fastest level gives nearly the same size as the zipfile default (6) at a fraction of the CPU.
+DEFAULT_ZIP_LEVEL = 1
+
+READ_WORKERS = 4
+# Reads submitted ahead of the writer; bounds how many file contents sit in memory at once
+READ_AHEAD = 2 * READ_WORKERS
+
+def _zip_level() -> int:
+    try:
+        return max(0, min(9, int(os.environ.get("ATOMIQ_ZIP_LEVEL", DEFAULT_ZIP_LEVEL))))
+    except ValueError:
+        return DEFAULT_ZIP_LEVEL
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def zip_dir(src_dir: str, zip_path: str, level: int | None = None) -> None:
     os.makedirs(os.path.dirname(zip_path), exist_ok=True)
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-        for folder, _, files in os.walk(src_dir):
-            for fn in files:
-                full = os.path.join(folder, fn)
-                arc = os.path.relpath(full, src_dir)
-                z.write(full, arcname=arc)                
+    level = _zip_level() if level is None else level
+    if level == 0:
+        compression, compresslevel = zipfile.ZIP_STORED, None
+    else:
+        compression, compresslevel = zipfile.ZIP_DEFLATED, level
+
+    entries = []
+    for folder, _, files in os.walk(src_dir):
+        for fn in files:
+            full = os.path.join(folder, fn)
+            entries.append((full, os.path.relpath(full, src_dir)))
+
+    # files are read on worker threads while the main thread deflates and writes the previous ones;
+    # at most READ_AHEAD reads are in flight, so a large tree is never held in memory all at once
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex, \
+            zipfile.ZipFile(zip_path, "w", compression, compresslevel=compresslevel) as z:
+        pending = deque()
+
+        def write_oldest() -> None:
+            full, arc, fut = pending.popleft()
+            info = zipfile.ZipInfo.from_file(full, arc)  # keeps mtime/permissions like ZipFile.write
+            z.writestr(info, fut.result(), compress_type=compression, compresslevel=compresslevel)
+
+        for full, arc in entries:
+            if len(pending) >= READ_AHEAD:
+                write_oldest()
+            pending.append((full, arc, ex.submit(_read_bytes, full)))
+        while pending:
+            write_oldest()
@@ -3,9 +3,20 @@
 from __future__ import annotations
 
 import asyncio
+import gc
+import itertools
 import json
+import logging
+import multiprocessing
 import os
+import shutil
+import stat
+import time
 import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Optional
@@ -15,17 +26,49 @@ from fastapi import (
     Form,
     File,
     UploadFile,
-    BackgroundTasks,
     HTTPException,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from agent.models import BuildOptions
-from agent.orchestrator import run_pipeline
+from agent.orchestrator import init_worker, run_pipeline_job
+from agent.utils.job_store import load_job, save_job
+
+logger = logging.getLogger(__name__)
+
+# Jobs run in these worker processes (each with its own GIL), so a busy pipeline never stalls
+# the event loop or other jobs; they report progress back through one queue (see _drain_events).
+POOL_WORKERS = max(2, (os.cpu_count() or 2) // 2)
+
+def _new_pool(queue) -> ProcessPoolExecutor:
+    # "spawn" on every OS: forking a server process that already runs threads is unsafe
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(POOL_WORKERS, mp_context=ctx, initializer=init_worker, initargs=(queue,))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.queue = multiprocessing.get_context("spawn").Queue()
+    app.state.pool = _new_pool(app.state.queue)
+    drain = asyncio.create_task(_drain_events(app.state.queue))
+    heartbeat = asyncio.create_task(_heartbeat())
+    try:
+        yield
+    finally:
+        heartbeat.cancel()
+        # queued jobs are dropped; running ones finish before the server exits
+        await asyncio.to_thread(app.state.pool.shutdown, wait=True, cancel_futures=True)
+        app.state.queue.put(None)
+        await drain
+        app.state.queue.close()
+        # free the queue's semaphores now (it sits in a reference cycle) so the multiprocessing
+        # resource tracker doesn't report them as leaked when the server exits
+        del app.state.pool, app.state.queue
+        gc.collect()
 
 # Creates the web API application (title/version shown in docs).
-app = FastAPI(title="Atomiq Suite Backend", version="1.0.0")
+app = FastAPI(title="Atomiq Suite Backend", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +79,19 @@ app.add_middleware(
 )
 
 JOBS: Dict[str, Dict[str, Any]] = {}
+# Log entries kept per job (older ones are dropped); also what GET /api/jobs/{id} returns
+LOG_LIMIT = 200
+# Status summary of every job, shared with the other workers (see agent/utils/job_store.py)
+JOBS_DB = str(Path(os.getcwd()) / "work" / "jobs.db")
+# Writes to JOBS_DB run on this one thread: off the event loop, and in the order they were made
+_db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db")
+# Unfinished jobs get their stored row refreshed this often by the owning worker; a row left
+# unrefreshed for STALE_AFTER_SECS belongs to a worker that died, and its job is reported failed.
+HEARTBEAT_SECS = 30
+STALE_AFTER_SECS = 3 * HEARTBEAT_SECS
+# How often a stream follows a job owned by another worker (it can't be woken across processes)
+STORED_POLL_SECS = 2
+TERMINAL = {"succeeded", "failed"}
 
 # -----------------------------------------------------------------------------
 # Helpers
@@ -62,6 +118,123 @@ def _job_dir(base: Path, job_id: str) -> Path:
     p.mkdir(parents=True, exist_ok=True)
     return p
 
+def _append_log(job: Dict[str, Any], progress: int, status: str, message: str) -> None:
+    """Add a log entry; 'seq' numbers entries per job so streams can tell which ones they already sent."""
+    job["log_seq"] += 1
+    job["logs"].append({
+        "seq": job["log_seq"], "progress": progress, "status": status, "message": message, "ts": _now_iso()
+    })
+
+def _tick(job: Dict[str, Any]) -> None:
+    """Wake the job's SSE streams (runs on the event loop)."""
+    job["_tick"].set()
+    job["_tick"] = asyncio.Event()
+
+def _fail(job: Dict[str, Any], message: str) -> None:
+    job["status"] = "failed"
+    job["message"] = f"Error: {message}"
+    _append_log(job, job["progress"], "Error", message)
+
+def _apply_event(job_id: str, kind: str, *args) -> None:
+    """Apply one event posted by orchestrator.run_pipeline_job to the JOBS store."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return
+    if kind == "start":
+        job["status"] = "running"
+    elif kind == "progress":
+        pct, status, message = args
+        pct = max(0, min(100, int(pct)))
+        job["progress"] = pct
+        if job["status"] not in TERMINAL:
+            job["status"] = "running" if pct < 100 else job["status"]
+        job["message"] = message or status
+        _append_log(job, pct, status, message)
+    elif kind == "done" and args[0] and Path(args[0]).is_file():
+        job["artifact"] = args[0]
+        job["progress"] = 100
+        job["status"] = "succeeded"
+        job["message"] = "Complete"
+        _append_log(job, 100, "Complete", "Artifact ready")
+    else:
+        _fail(job, args[0] if kind == "error" else "Artifact ZIP not found after pipeline.")
+    _persist(job_id, job)
+    _tick(job)
+
+async def _drain_events(queue) -> None:
+    """Apply worker events in the order they were posted until the None sentinel arrives."""
+    loop = asyncio.get_running_loop()
+    while True:
+        event = await loop.run_in_executor(None, queue.get)
+        if event is None:
+            return
+        try:
+            _apply_event(*event)
+        except Exception:
+            # one bad event must not stop the drain, or every later job would never leave "pending"
+            logger.exception("Could not apply worker event %r", event)
+
+def _job_exited(job_id: str, fut: asyncio.Future) -> None:
+    """Fail the job if its worker died (or was cancelled) before reporting an outcome."""
+    if fut.cancelled():
+        err = "Job cancelled"
+    elif fut.exception() is not None:
+        err = f"Worker process failed: {fut.exception()!r}"
+    else:
+        return
+    job = JOBS.get(job_id)
+    if job is not None and job["status"] not in TERMINAL:
+        _fail(job, err)
+        _persist(job_id, job)
+        _tick(job)
+
+def _persist(job_id: str, job: Dict[str, Any]) -> Future:
+    """Queue a write of the job's summary to JOBS_DB; never blocks the event loop."""
+    summary = {k: job[k] for k in ("status", "progress", "message", "artifact", "flags", "created_at")}
+    return _db_writer.submit(save_job, JOBS_DB, job_id, summary)
+
+async def _heartbeat() -> None:
+    """Keep the stored rows of this worker's unfinished jobs fresh (see STALE_AFTER_SECS)."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECS)
+        for job_id, job in list(JOBS.items()):
+            if job["status"] not in TERMINAL:
+                _persist(job_id, job)
+
+def _load_stored(job_id: str) -> Optional[Dict[str, Any]]:
+    """Stored summary of a job (blocking). An unfinished job whose owner stopped refreshing it
+    (its worker or the whole server died) is marked failed, so pollers and streams can finish."""
+    job = load_job(JOBS_DB, job_id)
+    if job and job["status"] not in TERMINAL and time.time() - (job["updated_at"] or 0) > STALE_AFTER_SECS:
+        job["status"] = "failed"
+        job["message"] = "Error: job lost; the server running it stopped"
+        save_job(JOBS_DB, job_id, job)
+    return job
+
+async def _find_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """This worker's live job, else the stored summary of a job run by another worker (no logs)."""
+    job = JOBS.get(job_id)
+    if job is not None:
+        return job
+    return await run_in_threadpool(_load_stored, job_id)
+
+def _event(job_id: str, job: Dict[str, Any], message: str, ts: str) -> str:
+    """One SSE frame describing the job."""
+    payload = {
+        "jobId": job_id,
+        "progress": job["progress"],
+        "status": job["status"],
+        "message": message,
+        "ts": ts,
+        "artifactUrl": f"/api/jobs/{job_id}/artifact" if job.get("artifact") else None,
+    }
+    return "data: " + json.dumps(payload) + "\n\n"
+
+def _save_upload(src, dst: Path) -> None:
+    """Copy an uploaded file to disk in 1 MiB chunks (never holds the whole upload in memory)."""
+    with open(dst, "wb") as out:
+        shutil.copyfileobj(src, out, length=1 << 20)
+
 # -----------------------------------------------------------------------------
 # Health
 # -----------------------------------------------------------------------------
@@ -75,8 +248,6 @@ async def health():
 # Kicks off the whole pipeline in the background and immediately returns a jobId.
 @app.post("/api/build")
 async def build(
-    background: BackgroundTasks,
-
     # Canonical snake_case fields (Angular service should send these)
     github_url: str = Form(...),
     prompt: str = Form(""),
@@ -103,10 +274,6 @@ async def build(
     elif not gen_unit and not gen_bdd:
         gen_unit = True
 
-    # --- Make OpenAI key available to CrewAI/LangChain (never log the key) ---
-    if api_key:
-        os.environ["OPENAI_API_KEY"] = api_key
-
     # --- Create job entry & persist upload (if any) ---
     job_id = str(uuid.uuid4())
     base_dir = Path(os.getcwd())
@@ -116,19 +283,22 @@ async def build(
     if file is not None and file.filename:
         dst = work_dir / "upload" / file.filename
         dst.parent.mkdir(parents=True, exist_ok=True)
-        dst.write_bytes(await file.read())
+        await run_in_threadpool(_save_upload, file.file, dst)
         uploaded_path = str(dst)
 
     JOBS[job_id] = {
+        "_tick": asyncio.Event(),  # set (and replaced) whenever the job changes; see _tick
         "status": "pending",
         "progress": 0,
         "message": "Queued",
-        "logs": [],
+        "logs": deque(maxlen=LOG_LIMIT),
+        "log_seq": 0,
         "artifact": None,
         "work_dir": str(work_dir),
         "created_at": _now_iso(),
         "flags": {"generate_unit": gen_unit, "generate_bdd": gen_bdd},
     }
+    await asyncio.wrap_future(_persist(job_id, JOBS[job_id]))  # stored before other workers can be asked
 
     # --- Options object passed to orchestrator ---
     opts = BuildOptions(
@@ -137,47 +307,20 @@ async def build(
         prompt=prompt,
         llm_provider=llm_provider,
         llm_model=llm_model,
-        api_key=api_key,
+        api_key=api_key or os.environ.get("OPENAI_API_KEY"),  # the server's own key when the form has none
         requirement_path=uploaded_path,   # <— CrewAI agents can read this
         generate_unit=gen_unit,
         generate_bdd=gen_bdd,
-    )
-
-    # --- Pipeline progress callback -> updates the JOBS store ---
-    def _progress(pct: int, status: str, message: str = ""):
-        pct = max(0, min(100, int(pct)))
-        job = JOBS[job_id]
-        job["progress"] = pct
-        if job["status"] not in {"succeeded", "failed"}:
-            job["status"] = "running" if pct < 100 else job["status"]
-        job["message"] = message or status
-        job["logs"].append({
-            "progress": pct, "status": status, "message": message, "ts": _now_iso()
-        })
-
-    # --- Background worker that runs the pipeline and finalizes the job ---
-    def _run_job():
-        try:
-            JOBS[job_id]["status"] = "running"
-            zip_path = run_pipeline(opts, job_progress_cb=_progress, base_dir=str(base_dir))
-            if zip_path and Path(zip_path).is_file():
-                JOBS[job_id]["artifact"] = zip_path
-                JOBS[job_id]["progress"] = 100
-                JOBS[job_id]["status"] = "succeeded"
-                JOBS[job_id]["message"] = "Complete"
-                JOBS[job_id]["logs"].append({
-                    "progress": 100, "status": "Complete", "message": "Artifact ready", "ts": _now_iso()
-                })
-            else:
-                raise FileNotFoundError("Artifact ZIP not found after pipeline.")
-        except Exception as e:
-            JOBS[job_id]["status"] = "failed"
-            JOBS[job_id]["message"] = f"Error: {e}"
-            JOBS[job_id]["logs"].append({
-                "progress": JOBS[job_id]["progress"], "status": "Error", "message": str(e), "ts": _now_iso()
-            })
-
-    background.add_task(_run_job)
+    ).to_pipeline_options()
+
+    # --- Run the pipeline in a worker process; its progress arrives via _drain_events ---
+    loop = asyncio.get_running_loop()
+    try:
+        fut = loop.run_in_executor(app.state.pool, run_pipeline_job, opts, str(base_dir))
+    except BrokenProcessPool:  # a worker died earlier; start a fresh pool
+        app.state.pool = _new_pool(app.state.queue)
+        fut = loop.run_in_executor(app.state.pool, run_pipeline_job, opts, str(base_dir))
+    fut.add_done_callback(lambda f: _job_exited(job_id, f))
     return JSONResponse({"jobId": job_id})
 
 # -----------------------------------------------------------------------------
@@ -185,7 +328,7 @@ async def build(
 # -----------------------------------------------------------------------------
 @app.get("/api/jobs/{job_id}")
 async def get_job(job_id: str):
-    job = JOBS.get(job_id)
+    job = await _find_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     artifact_url = f"/api/jobs/{job_id}/artifact" if job.get("artifact") else None
@@ -197,7 +340,7 @@ async def get_job(job_id: str):
         "artifactUrl": artifact_url,
         "flags": job.get("flags", {}),
         "createdAt": job["created_at"],
-        "logs": job["logs"][-200:],  # keep payload lean
+        "logs": list(job["logs"]),  # bounded by LOG_LIMIT
     }
 
 # -----------------------------------------------------------------------------
@@ -205,57 +348,85 @@ async def get_job(job_id: str):
 # -----------------------------------------------------------------------------
 @app.get("/api/jobs/{job_id}/events")
 async def stream_events(job_id: str):
-    if job_id not in JOBS:
+    if not await _find_job(job_id):
         raise HTTPException(status_code=404, detail="Job not found")
 
     async def event_gen():
-        last_len = 0
+        last_seq = 0
         while True:
             job = JOBS.get(job_id)
             if not job:
                 break
+            # Taken before reading the job, so a change made while we stream still wakes us below
+            tick = job["_tick"]
 
             # Stream only new log entries
             logs = job["logs"]
-            if len(logs) > last_len:
-                for entry in logs[last_len:]:
-                    payload = {
-                        "jobId": job_id,
-                        "progress": job["progress"],
-                        "status": job["status"],
-                        "message": entry.get("message") or entry.get("status"),
-                        "ts": entry.get("ts"),
-                        "artifactUrl": f"/api/jobs/{job_id}/artifact" if job.get("artifact") else None,
-                    }
-                    # Proper SSE frame
-                    yield "data: " + json.dumps(payload) + "\n\n"
-                last_len = len(logs)
+            if logs and logs[-1]["seq"] > last_seq:
+                # the unsent entries sit at the end; the seq check covers an append racing with len()
+                skip = max(0, len(logs) - (logs[-1]["seq"] - last_seq))
+                for entry in list(itertools.islice(logs, skip, None)):
+                    if entry["seq"] > last_seq:
+                        last_seq = entry["seq"]
+                        yield _event(job_id, job, entry.get("message") or entry.get("status"), entry.get("ts"))
 
             # Stop streaming after a terminal state
-            if job["status"] in {"succeeded", "failed"}:
+            if job["status"] in TERMINAL:
                 break
 
-            await asyncio.sleep(0.5)
+            try:
+                await asyncio.wait_for(tick.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"  # SSE comment keeps proxies from closing an idle stream
+
+    # Job running in another worker: follow its stored summary instead of the (unavailable) logs
+    async def stored_gen():
+        last = None
+        idle = 0
+        while True:
+            job = await run_in_threadpool(_load_stored, job_id)
+            if not job:
+                break
+            state = (job["progress"], job["status"], job["message"])
+            if state != last:
+                last, idle = state, 0
+                yield _event(job_id, job, job["message"], _now_iso())
+            elif idle >= 30:
+                idle = 0
+                yield ": keepalive\n\n"
+            # ends on success/failure, including the "failed" that _load_stored gives orphaned jobs
+            if job["status"] in TERMINAL:
+                break
+            await asyncio.sleep(STORED_POLL_SECS)
+            idle += STORED_POLL_SECS
 
     headers = {"Cache-Control": "no-cache", "Connection": "keep-alive"}
-    return StreamingResponse(event_gen(), media_type="text/event-stream", headers=headers)
+    gen = event_gen() if job_id in JOBS else stored_gen()
+    return StreamingResponse(gen, media_type="text/event-stream", headers=headers)
 
 # -----------------------------------------------------------------------------
 # Download artifact ZIP
 # -----------------------------------------------------------------------------
 @app.get("/api/jobs/{job_id}/artifact")
 async def download_artifact(job_id: str):
-    job = JOBS.get(job_id)
+    job = await _find_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     artifact = job.get("artifact")
-    if not artifact or not Path(artifact).is_file():
+    try:
+        st = os.stat(artifact) if artifact else None
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         raise HTTPException(status_code=404, detail="Artifact not found")
+    # Passing the stat result saves FileResponse a second stat; servers offering the ASGI
+    # "http.response.pathsend" extension then send the file without copying it through Python.
     return FileResponse(
         path=artifact,
         media_type="application/zip",
         filename=Path(artifact).name,
         headers={"Cache-Control": "no-cache"},
+        stat_result=st,
     )
 
 # -----------------------------------------------------------------------------